@@ -4,39 +4,158 @@ Stateless MCP adapter that proxies sanitize/rehydrate requests to the judge serv
 
 from __future__ import annotations
 
+import asyncio
+import itertools
 import json
 import os
 
 import httpx
 from dedalus.sdk import ToolServer, run_server, tool
 
+try:  # HTTP/2 multiplexing needs the optional "h2" package (httpx[http2])
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+try:  # optional: pipelined sanitize over the judge's /ingest_stream WebSocket
+    import websockets
+except ImportError:  # pragma: no cover
+    websockets = None
+
 
 class PIIProxyTools(ToolServer):
     base_url = os.getenv("JUDGE_URL", "http://127.0.0.1:9000")
+    _http: httpx.AsyncClient | None = None
+    _ws = None
+    _ws_reader: asyncio.Task | None = None
+    _ws_lock: asyncio.Lock | None = None
+    _pending: dict[int, asyncio.Future] | None = None
+    _ids = itertools.count()
+    _stream_unavailable = False
+    _lifetime = None
+
+    async def _bind_loop(self) -> None:
+        """
+        Tie aclose() to the serving event loop. The loop's shutdown_asyncgens()
+        (run by asyncio.run/uvicorn on exit) finalizes this parked generator, so
+        the pool, socket and reader task are closed on the loop that owns them.
+        """
+        if self._lifetime is None:
+            self._lifetime = self._until_shutdown()
+            await self._lifetime.__anext__()
+
+    async def _until_shutdown(self):
+        try:
+            yield
+        finally:
+            await self.aclose()
+
+    def _client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client so tool calls reuse judge connections."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(60),
+                limits=httpx.Limits(max_keepalive_connections=64, max_connections=256),
+            )
+        return self._http
+
+    async def _stream(self):
+        """Single /ingest_stream connection shared by all sessions, opened on first use."""
+        if self._ws_lock is None:
+            self._ws_lock = asyncio.Lock()
+        async with self._ws_lock:
+            if self._ws is None:
+                url = "ws" + self.base_url[len("http"):] if self.base_url.startswith("http") else self.base_url
+                try:
+                    self._ws = await websockets.connect(url.rstrip("/") + "/ingest_stream")
+                except websockets.exceptions.InvalidHandshake:
+                    self._stream_unavailable = True  # no /ingest_stream on this judge; stop trying
+                    raise
+                except asyncio.TimeoutError as exc:  # opening handshake, not a slow reply
+                    raise ConnectionError("Judge stream handshake timed out") from exc
+                self._pending = {}
+                self._ws_reader = asyncio.create_task(self._read_stream(self._ws, self._pending))
+        return self._ws
+
+    async def _read_stream(self, ws, pending: dict[int, asyncio.Future]) -> None:
+        """Resolve pending sanitize futures as responses arrive, in any order."""
+        try:
+            async for raw in ws:
+                data = json.loads(raw)
+                future = pending.pop(data.pop("id", None), None)
+                if future is None or future.done():
+                    continue
+                if "error" in data:
+                    future.set_exception(RuntimeError(data["error"]))
+                else:
+                    future.set_result(data)
+        except Exception:  # connection dropped; fail waiters below
+            pass
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Judge stream closed"))
+            pending.clear()
+            await ws.close()  # also when cancelled at loop shutdown, before aclose() runs
+
+    async def _sanitize_streamed(self, session_id: str, text: str) -> dict:
+        ws = await self._stream()
+        req_id = next(self._ids)
+        pending = self._pending
+        future = pending[req_id] = asyncio.get_running_loop().create_future()
+        try:
+            await ws.send(json.dumps({"id": req_id, "session_id": session_id, "user_prompt": text}))
+            return await asyncio.wait_for(future, timeout=60)
+        finally:
+            pending.pop(req_id, None)
+
+    async def aclose(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        reader, self._ws_reader = self._ws_reader, None
+        if reader is not None and not reader.done():
+            await asyncio.wait([reader])  # ends once the socket is closed
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     @tool
     async def sanitize(self, session_id: str, text: str) -> str:
         """Forward sanitize requests to the judge service."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/ingest",
-                json={"session_id": session_id, "user_prompt": text},
-                timeout=60,
-            )
-            response.raise_for_status()
+        await self._bind_loop()
+        if websockets is not None and not self._stream_unavailable:
+            try:
+                return json.dumps(await self._sanitize_streamed(session_id, text))
+            except asyncio.TimeoutError:
+                raise  # the judge is slow, not absent: a POST would ingest the prompt twice
+            except (OSError, websockets.exceptions.WebSocketException):
+                pass  # judge without /ingest_stream (or unreachable): plain POST below
+        response = await self._client().post(
+            "/ingest",
+            json={"session_id": session_id, "user_prompt": text},
+            timeout=60,
+        )
+        response.raise_for_status()
         data = response.json()
         return json.dumps(data)
 
     @tool
     async def rehydrate(self, session_id: str, text: str) -> str:
         """Forward rehydrate requests to the judge service."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/rehydrate",
-                json={"session_id": session_id, "text": text},
-                timeout=30,
-            )
-            response.raise_for_status()
+        await self._bind_loop()
+        response = await self._client().post(
+            "/rehydrate",
+            json={"session_id": session_id, "text": text},
+            timeout=30,
+        )
+        response.raise_for_status()
         data = response.json()
         return data["rehydrated_text"]
 
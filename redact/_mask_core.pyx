@@ -0,0 +1,27 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+C-level span splicing for LiquidAIPIIExtractor._mask_text.
+
+Build in place (optional; liquidai_pii falls back to pure Python when missing):
+    cythonize -i redact/_mask_core.pyx
+"""
+
+
+def splice_spans(unicode text, list spans):
+    """
+    Replace text[start:end] with placeholder for each (start, end, placeholder)
+    in `spans` (sorted, non-overlapping) and return the joined result.
+    """
+    cdef list parts = []
+    cdef Py_ssize_t last = 0, start, end
+    cdef tuple span
+    if not spans:
+        return text
+    for span in spans:
+        start = span[0]
+        end = span[1]
+        parts.append(text[last:start])
+        parts.append(span[2])
+        last = end
+    parts.append(text[last:])
+    return u"".join(parts)
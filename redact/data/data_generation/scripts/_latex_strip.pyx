@@ -0,0 +1,165 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Single-pass scanner equivalent to `LATEX_FUSED.sub(_fused_repl, s)` in generate.py.
+
+Build in place (optional; generate.py falls back to the regex when missing):
+    cd redact/data/data_generation/scripts && cythonize -i _latex_strip.pyx
+
+Each position is tried against the same branches, in the same order, as the
+fused regex; kept arguments are scanned again on their own slice.
+"""
+from cpython.unicode cimport Py_UNICODE_ISSPACE
+
+cdef tuple DROP_WHOLE = ("vspace", "hspace", "smallskip", "medskip", "bigskip", "pagestyle")
+cdef tuple INLINE = ("textbf", "textit", "emph")
+cdef tuple SPACES = ("quad", "qquad", ",", ";", ":")
+cdef tuple MISC = ("checked", "unchecked", "hfill", "bfseries", "large", "Large", "normalsize")
+
+
+cdef inline bint _is_alpha(Py_UCS4 c):
+    return (u'a' <= c <= u'z') or (u'A' <= c <= u'Z')
+
+
+cdef Py_ssize_t _prefix(unicode s, Py_ssize_t i, Py_ssize_t end, tuple names):
+    """Length of the first name in `names` that s[i:end] starts with, or -1."""
+    cdef unicode name
+    for name in names:
+        if s.startswith(name, i, end):
+            return len(name)
+    return -1
+
+
+cdef Py_ssize_t _find(unicode s, Py_ssize_t i, Py_ssize_t end, Py_UCS4 stop):
+    while i < end and s[i] != stop:
+        i += 1
+    return i
+
+
+cdef Py_ssize_t _brace_group(unicode s, Py_ssize_t i, Py_ssize_t end):
+    """Match `\\{[^{}]*\\}` at i; return the index past '}' or -1."""
+    cdef Py_UCS4 c
+    if i >= end or s[i] != u'{':
+        return -1
+    i += 1
+    while i < end:
+        c = s[i]
+        if c == u'}':
+            return i + 1
+        if c == u'{':
+            return -1
+        i += 1
+    return -1
+
+
+cdef Py_ssize_t _opt_and_arg(unicode s, Py_ssize_t i, Py_ssize_t end, bint spaced):
+    """Skip `\\*?`, optional whitespace and an optional `[...]`; return the new index."""
+    cdef Py_ssize_t j
+    if i < end and s[i] == u'*':
+        i += 1
+    if spaced:
+        while i < end and Py_UNICODE_ISSPACE(s[i]):
+            i += 1
+    if i < end and s[i] == u'[':
+        j = _find(s, i + 1, end, u']')
+        if j < end:
+            i = j + 1
+    if spaced:
+        while i < end and Py_UNICODE_ISSPACE(s[i]):
+            i += 1
+    return i
+
+
+cdef unicode _scan(unicode s, Py_ssize_t start, Py_ssize_t end):
+    cdef list out = []
+    cdef Py_ssize_t i = start, last = start, j, k, n
+    cdef Py_UCS4 c, nxt
+    while i < end:
+        c = s[i]
+        if c == u'\\':
+            # \begin{...} / \end{...}
+            n = _prefix(s, i + 1, end, ("begin", "end"))
+            if n > 0 and i + 1 + n < end and s[i + 1 + n] == u'{':
+                j = _find(s, i + 2 + n, end, u'}')
+                if j < end and j > i + 2 + n:
+                    out.append(s[last:i])
+                    i = last = j + 1
+                    continue
+            # spacing/page-style incl. argument -> drop
+            n = _prefix(s, i + 1, end, DROP_WHOLE)
+            if n > 0:
+                j = _opt_and_arg(s, i + 1 + n, end, True)
+                k = _brace_group(s, j, end)
+                out.append(s[last:i])
+                i = last = (k if k > 0 else j)
+                continue
+            # simple inline formatting -> keep argument
+            n = _prefix(s, i + 1, end, INLINE)
+            if n > 0:
+                j = _opt_and_arg(s, i + 1 + n, end, True)
+                k = _brace_group(s, j, end)
+                if k > 0:
+                    out.append(s[last:i])
+                    out.append(_scan(s, j + 1, k - 1))
+                    i = last = k
+                    continue
+            # spacing commands -> single space
+            n = _prefix(s, i + 1, end, SPACES)
+            if n > 0:
+                out.append(s[last:i])
+                out.append(u' ')
+                i = last = i + 1 + n
+                continue
+            # commands with no visible effect -> drop
+            n = _prefix(s, i + 1, end, MISC)
+            if n < 0 and s.startswith("ding{", i + 1, end):
+                j = _find(s, i + 6, end, u'}')
+                if j < end:
+                    n = j - i
+            if n > 0:
+                out.append(s[last:i])
+                i = last = i + 1 + n
+                continue
+            # generic \command{arg} -> keep argument; else drop \command[...]
+            j = i + 1
+            while j < end and _is_alpha(s[j]):
+                j += 1
+            if j > i + 1:
+                k = _brace_group(s, _opt_and_arg(s, j, end, True), end)
+                out.append(s[last:i])
+                if k > 0:
+                    out.append(_scan(s, _opt_and_arg(s, j, end, True) + 1, k - 1))
+                    i = last = k
+                else:
+                    i = last = _opt_and_arg(s, j, end, False)
+                continue
+        elif c == u'~':
+            out.append(s[last:i])
+            out.append(u' ')
+            i = last = i + 1
+            continue
+        elif i + 1 < end:
+            # column-spec crumbs
+            nxt = s[i + 1]
+            k = -1
+            if c == u'{' and nxt == u'@':
+                j = i + 2
+                while j < end and s[j] != u'{' and s[j] != u'}':
+                    j += 1
+                if j < end and s[j] == u'}' and j > i + 2 and s[j - 1] == u'@':
+                    k = j + 1
+            elif nxt == u'{' and (c == u'>' or c == u'<' or c == u'p' or c == u'm' or c == u'b'):
+                k = _brace_group(s, i + 1, end)
+            if k > 0:
+                out.append(s[last:i])
+                i = last = k
+                continue
+        i += 1
+    if last == start and not out:
+        return s[start:end]
+    out.append(s[last:end])
+    return u''.join(out)
+
+
+def strip_commands(unicode s) -> unicode:
+    """Drop/unwrap LaTeX commands and column-spec crumbs in one left-to-right scan."""
+    return _scan(s, 0, len(s))
@@ -22,28 +22,59 @@ Usage:
   python data_generation/scripts/generate.py --csv data_generation/master_label.csv
   python data_generation/scripts/generate.py --csv ... --out-root data/generations
   python data_generation/scripts/generate.py --csv ... --run-name "Generation_MyBatch"
+  python data_generation/scripts/generate.py --csv ... --jobs 4
 """
 
 import argparse
+import asyncio
 import csv
+import functools
+import hashlib
+import json
 import os
 import re
 import shutil
-import subprocess
 import sys
 import tempfile
 import importlib.util
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, Template
+
+try:  # optional: google-re2 for the LaTeX stripper
+    import re2
+except ImportError:
+    re2 = None
+
+try:  # optional: SIMD blake3 for build-cache keys (falls back to blake2b)
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+try:  # optional: multithreaded, block-streamed CSV parsing
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+try:  # optional: Cython build of the fused LaTeX pass (cythonize -i _latex_strip.pyx)
+    from _latex_strip import strip_commands
+except ImportError:
+    strip_commands = None
 
 # Paths
 ROOT = Path(__file__).resolve().parents[1]     # .../data_generation
 TEMPLATES = ROOT / "templates"
 OUT_ROOT_DEFAULT = ROOT.parent / "generations"
 MODULES_DIR = Path(__file__).resolve().parent / "modules"
+JINJA_CACHE = ROOT / ".jinja_cache"   # compiled template bytecode, reused across runs
+# TeX intermediates (.aux/.log/.fls/...) live in RAM where tmpfs is available;
+# only the final PDF copy touches persistent storage.
+SCRATCH_ROOT = Path("/dev/shm") if Path("/dev/shm").is_dir() else None
 
 # Placeholders actually used in templates
 PLACEHOLDER_KEYS = [
@@ -56,6 +87,8 @@ PLACEHOLDER_KEYS = [
 # CSV required keys (full_name is optional for now)
 CSV_REQUIRED = PLACEHOLDER_KEYS + ["file_name", "template_id"]
 CSV_OPTIONAL = ["full_name"]
+CSV_COLUMNS = list(dict.fromkeys(CSV_REQUIRED + CSV_OPTIONAL))   # the only columns kept after reading
+CSV_BATCH_ROWS = 8192   # rows per column batch on the csv-module fallback
 
 
 # ---------- Plugin hooks (optional) ----------
@@ -78,19 +111,108 @@ def call_hook(mods, hook, *args, **kwargs):
             fn(*args, **kwargs)
 
 # ---------- CSV & naming ----------
-def read_csv_rows(csv_path: Path) -> List[Dict]:
-    """Read CSV with simple auto-detection of tab vs comma; UTF-8 with/without BOM."""
-    text = csv_path.read_text(encoding="utf-8-sig")
-    lines = [ln for ln in text.splitlines() if ln.strip() != ""]
-    if not lines:
-        return []
-    delimiter = "\t" if ("\t" in lines[0]) else ","
-    reader = csv.DictReader(lines, delimiter=delimiter)
-    rows = []
-    for row in reader:
-        norm = { (k.strip() if k else k): (v.strip() if isinstance(v, str) else v) for k, v in row.items() }
-        rows.append(norm)
-    return rows
+def _sniff_csv(csv_path: Path):
+    """Delimiter and raw header names, read from the first non-empty line only."""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as fh:
+        for line in fh:
+            if line.strip() != "":
+                delimiter = "\t" if ("\t" in line) else ","
+                return delimiter, next(csv.reader([line], delimiter=delimiter))
+    return None, []
+
+def _ragged_row_error(csv_path: Path, delimiter: str, header: List[str], row, line) -> str:
+    """Message for a row Arrow cannot parse, in the same format as validate_row."""
+    line_hint = f"{csv_path.name}:line{line if line is not None else '?'}"
+    if row.actual_columns > row.expected_columns:
+        return f"{line_hint}: expected {row.expected_columns} fields, got {row.actual_columns}"
+    values = next(csv.reader([row.text], delimiter=delimiter), [])
+    fields = {(k.strip() if k else k): v.strip() for k, v in zip(header, values)}
+    missing = [k for k in CSV_REQUIRED if not fields.get(k)]
+    return f"{line_hint}: missing required fields {missing}"
+
+def _iter_arrow_columns(csv_path: Path, delimiter: str, header: List[str]):
+    ragged: List[str] = []
+    blank_rows = 0
+
+    def on_invalid_row(row):
+        nonlocal blank_rows
+        # Whitespace-only lines are skipped like the csv fallback does (Arrow's
+        # ignore_empty_lines only drops truly empty ones) and not counted as lines.
+        if row.text.strip() == "":
+            blank_rows += 1
+            return "skip"
+        line = row.number - blank_rows if row.number is not None else None
+        ragged.append(_ragged_row_error(csv_path, delimiter, header, row, line))
+        return "error"
+
+    try:
+        # Every column as string so ids/phone numbers keep their leading zeros
+        reader = pa_csv.open_csv(
+            str(csv_path),
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=8 << 20),
+            parse_options=pa_csv.ParseOptions(delimiter=delimiter, invalid_row_handler=on_invalid_row),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=False,
+            ),
+        )
+        yield from _validated_batches(csv_path, reader)
+    except pa.ArrowInvalid:
+        if ragged:
+            raise ValueError("\n".join(ragged)) from None
+        raise
+
+def _validated_batches(csv_path: Path, reader):
+    line = 2
+    for batch in reader:
+        names = {name.strip(): i for i, name in enumerate(batch.schema.names) if name}
+        trimmed = {k: pc.utf8_trim_whitespace(batch.column(names[k])) for k in CSV_COLUMNS if k in names}
+
+        # Validate the whole batch before any of its rows are rendered
+        missing = {
+            k: pc.equal(trimmed[k], "") if k in trimmed else pa.array([True] * batch.num_rows)
+            for k in CSV_REQUIRED
+        }
+        invalid = functools.reduce(pc.or_, missing.values())
+        if pc.any(invalid).as_py():
+            flags = {k: m.to_pylist() for k, m in missing.items()}
+            errors = [
+                f"{csv_path.name}:line{line + i}: missing required fields {[k for k in CSV_REQUIRED if flags[k][i]]}"
+                for i, bad in enumerate(invalid.to_pylist()) if bad
+            ]
+            raise ValueError("\n".join(errors))
+        line += batch.num_rows
+        yield {k: col.to_pylist() for k, col in trimmed.items()}
+
+def _normalize_row(row: Dict) -> Dict:
+    return { (k.strip() if k else k): (v.strip() if isinstance(v, str) else v) for k, v in row.items() }
+
+def iter_csv_columns(csv_path: Path) -> Iterator[Dict[str, List[str]]]:
+    """
+    Stream validated CSV rows as column batches ({key: [value, ...]} for CSV_COLUMNS only),
+    with simple auto-detection of tab vs comma; UTF-8 with/without BOM.
+    Only the current batch is held in memory. Raises ValueError for rows missing
+    required fields (with pyarrow, every such row of the batch in one message).
+    """
+    delimiter, header = _sniff_csv(csv_path)
+    if delimiter is None:
+        return
+    if pa is not None:
+        yield from _iter_arrow_columns(csv_path, delimiter, header)
+        return
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as fh:
+        reader = csv.DictReader((ln for ln in fh if ln.strip() != ""), delimiter=delimiter)
+        cols: Dict[str, List[str]] = {k: [] for k in CSV_COLUMNS}
+        for idx, row in enumerate(reader, start=2):
+            row = _normalize_row(row)
+            validate_row(row, f"{csv_path.name}:line{idx}")
+            for k, col in cols.items():
+                col.append(row[k])
+            if len(cols["file_name"]) >= CSV_BATCH_ROWS:
+                yield cols
+                cols = {k: [] for k in CSV_COLUMNS}
+        if cols["file_name"]:
+            yield cols
 
 def validate_row(row: Dict, line_hint: str):
     missing = [k for k in CSV_REQUIRED if not row.get(k)]
@@ -114,15 +236,20 @@ def sanitize_base(name: str) -> str:
     return base
 
 # ---------- Run folder ----------
+GENERATION_NUM = re.compile(r"Generation_(\d+)")
+
 def next_generation_name(out_root: Path) -> str:
     max_n = 0
-    for d in out_root.glob("Generation_*"):
-        m = re.match(r"Generation_(\d+)", d.name)
-        if m:
-            try:
-                max_n = max(max_n, int(m.group(1)))
-            except ValueError:
-                pass
+    # scandir yields bare names, no Path objects or per-entry stat()
+    with os.scandir(out_root) as it:
+        for entry in it:
+            if not entry.name.startswith("Generation_"):
+                continue
+            m = GENERATION_NUM.match(entry.name)
+            if m:
+                n = int(m.group(1))
+                if n > max_n:
+                    max_n = n
     num = max_n + 1
     now = datetime.now()
     label = now.strftime("%I-%M%p").lower()  # 01-25am
@@ -139,8 +266,26 @@ def make_run_dirs(out_root: Path, run_name: str | None):
     txt_dir.mkdir(parents=True, exist_ok=True)
     return run_dir, pdf_dir, txt_dir
 
+# ---------- Build cache ----------
+MANIFEST_NAME = "manifest.json"   # {content key: pdf path} shared by all runs under out-root
+
+def load_manifest(out_root: Path) -> Dict[str, str]:
+    try:
+        return json.loads((out_root / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(out_root: Path, manifest: Dict[str, str]):
+    (out_root / MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def content_key(engine: str, tex_source: str) -> str:
+    """The rendered TeX already reflects template, row values and hooks."""
+    data = f"{engine}\0{tex_source}".encode("utf-8")
+    return blake3(data).hexdigest() if blake3 is not None else hashlib.blake2b(data, digest_size=32).hexdigest()
+
 # ---------- LaTeX rendering & compile ----------
 def jinja_env() -> Environment:
+    JINJA_CACHE.mkdir(parents=True, exist_ok=True)
     return Environment(
         loader=FileSystemLoader(str(TEMPLATES)),
         autoescape=False,
@@ -149,99 +294,198 @@ def jinja_env() -> Environment:
         undefined=StrictUndefined,
         comment_start_string='((*',
         comment_end_string='*))',
+        # templates don't change during a run: no per-render stat(), no eviction
+        auto_reload=False,
+        cache_size=-1,
+        bytecode_cache=FileSystemBytecodeCache(directory=str(JINJA_CACHE)),
     )
 
-def render_tex_to_string(env: Environment, template_id: str, ctx: Dict) -> str:
+def load_template(env: Environment, template_id: str) -> Template:
     tpl_file = f"{template_id}.tex.j2"
     tpl_path = TEMPLATES / tpl_file
     if not tpl_path.exists():
         raise FileNotFoundError(f"Template not found: {tpl_path}")
-    return env.get_template(tpl_file).render(**ctx)
-
-def run_cmd(cmd, cwd: Path):
-    try:
-        proc = subprocess.run(
-            cmd, cwd=cwd, check=True,
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-        )
-        return True, proc.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stdout
-
-def compile_pdf(tex_source: str, engine: str, out_pdf: Path):
+    return env.get_template(tpl_file)
+
+def _specialize_row_contexts(keys: List[str]):
+    """
+    Build `row_contexts(cols)` for a fixed key list: it zips the key columns of a
+    batch and yields one dict literal per row (`{"full_name": v0, ...}`), with no
+    per-row comprehension or key loop.
+    """
+    names = [f"v{i}" for i in range(len(keys))]
+    items = ", ".join(f"{k!r}: {v}" for k, v in zip(keys, names))
+    columns = ", ".join(f"cols[{k!r}]" for k in keys)
+    src = f"def row_contexts(cols):\n    return ({{{items}}} for {', '.join(names)}, in zip({columns}))\n"
+    namespace: Dict = {}
+    exec(compile(src, "<row_contexts>", "exec"), namespace)
+    return namespace["row_contexts"]
+
+row_contexts = _specialize_row_contexts(PLACEHOLDER_KEYS)
+
+def render_tex_to_string(tpl: Template, ctx: Dict) -> str:
+    # A mapping argument is used as the context directly, without ** unpacking
+    return tpl.render(ctx)
+
+async def run_cmd(cmd, cwd: Path):
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+    out, _ = await proc.communicate()
+    return proc.returncode == 0, out.decode("utf-8", errors="replace")
+
+async def run_quiet(cmd, cwd: Path) -> bool:
+    """Like run_cmd but discards output; for runs whose log is only read on failure."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    return await proc.wait() == 0
+
+async def build_preamble_format(preamble: str, workdir: Path) -> Path | None:
+    """
+    Dump a pdflatex format for a shared preamble with mylatexformat so each
+    document can skip loading its packages. Returns None if the dump fails.
+    """
+    name = "preamble_" + hashlib.sha1(preamble.encode("utf-8")).hexdigest()[:12]
+    fmt_path = workdir / f"{name}.fmt"
+    if fmt_path.exists():
+        return fmt_path
+    (workdir / f"{name}.tex").write_text(preamble + "\\begin{document}\n\\end{document}\n", encoding="utf-8")
+    ok = await run_quiet(["pdflatex","-ini","-interaction=nonstopmode",f"-jobname={name}","&pdflatex","mylatexformat.ltx",f"{name}.tex"], cwd=workdir)
+    return fmt_path if (ok and fmt_path.exists()) else None
+
+async def compile_pdf(tex_source: str, engine: str, out_pdf: Path, workdir: Path | None = None,
+                      fmt_path: Path | None = None, job: str | None = None):
+    """
+    Compile tex_source to out_pdf. In a shared workdir every concurrent build
+    needs its own `job` name (default: out_pdf's stem); the PDF is copied to
+    out_pdf afterwards. fmt_path (pdflatex only) is a precompiled preamble
+    from build_preamble_format.
+    """
     out_pdf.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.TemporaryDirectory() as tmpd:
-        tmpdir = Path(tmpd)
-        tex_path = tmpdir / "doc.tex"
-        tex_path.write_text(tex_source, encoding="utf-8")
-
+    if workdir is None:
+        with tempfile.TemporaryDirectory(dir=SCRATCH_ROOT) as tmpd:
+            return await compile_pdf(tex_source, engine, out_pdf, Path(tmpd), fmt_path, job)
+
+    job = job or out_pdf.stem
+    tex_file = f"{job}.tex"
+    (workdir / tex_file).write_text(tex_source, encoding="utf-8")
+
+    # Happy path: latexmk output is not piped back; the fallback below captures
+    # the engine log if anything goes wrong.
+    if engine == "xelatex":
+        ok = await run_quiet(["latexmk","-xelatex","-interaction=nonstopmode","-halt-on-error","-file-line-error",tex_file], cwd=workdir)
+    elif engine == "lualatex":
+        ok = await run_quiet(["latexmk","-lualatex","-interaction=nonstopmode","-halt-on-error","-file-line-error",tex_file], cwd=workdir)
+    elif fmt_path is not None:
+        ok = await run_quiet(["latexmk","-pdf",f"-pdflatex=pdflatex -fmt={fmt_path.stem} %O %S","-interaction=nonstopmode","-halt-on-error","-file-line-error",tex_file], cwd=workdir)
+    else:
+        ok = await run_quiet(["latexmk","-pdf","-interaction=nonstopmode","-halt-on-error","-file-line-error",tex_file], cwd=workdir)
+
+    pdf_tmp = workdir / f"{job}.pdf"
+    if not (ok and pdf_tmp.exists()):
+        # Plain engine runs, without the precompiled format, as a fallback (output captured)
         if engine == "xelatex":
-            ok, log = run_cmd(["latexmk","-xelatex","-interaction=nonstopmode","-halt-on-error","-file-line-error","doc.tex"], cwd=tmpdir)
+            ok1, log1 = await run_cmd(["xelatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
+            ok2, log2 = await run_cmd(["xelatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
         elif engine == "lualatex":
-            ok, log = run_cmd(["latexmk","-lualatex","-interaction=nonstopmode","-halt-on-error","-file-line-error","doc.tex"], cwd=tmpdir)
+            ok1, log1 = await run_cmd(["lualatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
+            ok2, log2 = await run_cmd(["lualatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
         else:
-            ok, log = run_cmd(["latexmk","-pdf","-interaction=nonstopmode","-halt-on-error","-file-line-error","doc.tex"], cwd=tmpdir)
-
-        pdf_tmp = tmpdir / "doc.pdf"
-        if not (ok and pdf_tmp.exists()):
-            if engine == "xelatex":
-                ok1, log1 = run_cmd(["xelatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-                ok2, log2 = run_cmd(["xelatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-            elif engine == "lualatex":
-                ok1, log1 = run_cmd(["lualatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-                ok2, log2 = run_cmd(["lualatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-            else:
-                ok1, log1 = run_cmd(["pdflatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-                ok2, log2 = run_cmd(["pdflatex","-interaction=nonstopmode","-halt-on-error","doc.tex"], cwd=tmpdir)
-            if not pdf_tmp.exists():
-                combined = (log or "") + "\n" + (log1 or "") + "\n" + (log2 or "")
-                raise RuntimeError("PDF compilation failed.\n" + combined)
-
-        shutil.copy2(pdf_tmp, out_pdf)
+            ok1, log1 = await run_cmd(["pdflatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
+            ok2, log2 = await run_cmd(["pdflatex","-interaction=nonstopmode","-halt-on-error",tex_file], cwd=workdir)
+        if not pdf_tmp.exists():
+            combined = (log1 or "") + "\n" + (log2 or "")
+            raise RuntimeError("PDF compilation failed.\n" + combined)
+
+    copy_pdf(pdf_tmp, out_pdf)
+
+def copy_pdf(src: Path, dst: Path):
+    """
+    shutil.copy2 with an in-kernel fast path: copy_file_range (Linux) moves the
+    bytes without a userspace buffer. Falls back to copy2 where unsupported.
+    Like copy2, raises shutil.SameFileError instead of truncating src onto itself.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if n == 0:
+                        raise OSError(f"copy_file_range stopped early on {src}")
+                    remaining -= n
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass  # e.g. cross-device on old kernels, or unsupported filesystem
+    shutil.copy2(src, dst)
 
 # ---------- LaTeX -> plain text (simple stripper tuned to these templates) ----------
 # ---------- LaTeX -> plain text (robust stripper) ----------
-# Remove entire begin/end lines for tabular/tabularx so column specs never leak.
-TABULAR_LINES = re.compile(r'^.*\\begin\{tabularx?\}.*$\n?|^.*\\end\{tabularx?\}.*$\n?', flags=re.M)
-
-# Remove vspace/hspace & relatives completely (don’t leave "0.8em")
-LATEX_DROP_WHOLE = re.compile(
-    r'\\(?:vspace|hspace|smallskip|medskip|bigskip|pagestyle)\*?\s*(?:\[[^\]]*\])?\s*(?:\{[^{}]*\})?',
-    flags=re.S
-)
-
-# Simple inline formatting: keep the argument only
-LATEX_INLINE_KEEPARG_RE = re.compile(
-    r'\\(?:textbf|textit|emph)\*?\s*(?:\[[^\]]*\])?\s*\{([^{}]*)\}'
-)
-
-# Spacing commands → a single space
-LATEX_INLINE_SPACES = re.compile(r'(?:\\quad|\\qquad|\\,|\\;|\\:|~)')
+# Patterns without lookarounds/backrefs go through RE2 when it is installed
+# (linear-time, no pathological backtracking); flags are written inline so the
+# same source compiles under either engine.
+def _linear_re(pattern: str):
+    return re2.compile(pattern) if re2 is not None else re.compile(pattern)
 
-# Misc commands with no visible effect
-LATEX_MISC_CMDS = re.compile(r'(?:\\checked|\\unchecked|\\ding\{[^}]*\}|\\hfill|\\bfseries|\\large|\\Large|\\normalsize)')
+DOCUMENT_BODY = _linear_re(r'(?s)\\begin\{document\}(.*)\\end\{document\}')
+LATEX_COMMENT = re.compile(r'(?<!\\)%.*')
 
-# Generic \command{arg} → keep arg
-LATEX_CMD_ARG_TO_ARG = re.compile(r'\\[a-zA-Z]+\*?\s*(?:\[[^\]]*\])?\s*\{([^{}]*)\}')
+# Remove entire begin/end lines for tabular/tabularx so column specs never leak.
+TABULAR_LINES = _linear_re(r'(?m)^.*\\begin\{tabularx?\}.*$\n?|^.*\\end\{tabularx?\}.*$\n?')
+
+# All command-level rewrites in ONE left-to-right pass. Alternatives are tried
+# in order, so a branch listed earlier wins exactly where its pass used to run
+# earlier; kept arguments are fed back through the same pass.
+LATEX_FUSED = _linear_re('|'.join([
+    # any \begin{...}/\end{...} -> drop
+    r'(?P<beginend>\\(?:begin|end)\{[^}]+\})',
+    # spacing/page-style incl. argument -> drop (don’t leave "0.8em")
+    r'(?P<drop_whole>\\(?:vspace|hspace|smallskip|medskip|bigskip|pagestyle)\*?\s*(?:\[[^\]]*\])?\s*(?:\{[^{}]*\})?)',
+    # simple inline formatting -> keep argument
+    r'\\(?:textbf|textit|emph)\*?\s*(?:\[[^\]]*\])?\s*\{(?P<inline_arg>[^{}]*)\}',
+    # spacing commands -> single space
+    r'(?P<spaces>\\quad|\\qquad|\\,|\\;|\\:|~)',
+    # commands with no visible effect -> drop
+    r'(?P<misc>\\checked|\\unchecked|\\ding\{[^}]*\}|\\hfill|\\bfseries|\\large|\\Large|\\normalsize)',
+    # generic \command{arg} -> keep argument
+    r'\\[a-zA-Z]+\*?\s*(?:\[[^\]]*\])?\s*\{(?P<cmd_arg>[^{}]*)\}',
+    # leftover \command[...] / \command -> drop
+    r'(?P<cmd>\\[a-zA-Z]+\*?(?:\[[^\]]*\])?)',
+    # column-spec crumbs {@...@}, >{...}, <{...}, p{...}, m{...}, b{...} -> drop
+    r'(?P<colspec>\{@[^{}]*@\}|>\{[^{}]*\}|<\{[^{}]*\}|p\{[^{}]*\}|m\{[^{}]*\}|b\{[^{}]*\})',
+]))
+
+# Line/context dependent column-spec leftovers stay separate passes:
+#  lines that are just @ ... @, and stray single " X "
+COLSPEC_STANDALONE_LINE = _linear_re(r'(?m)^\s*\{?@.*@}?\s*$')
+COLSPEC_ISOLATED_X = re.compile(r'(?<=\s)X(?=\s)')  # rare; only if it’s separated by spaces
 
-# Generic \command[...] or bare \command → drop
-LATEX_CMD_DROP = re.compile(r'\\[a-zA-Z]+\*?(?:\[[^\]]*\])?')
-BEGIN_END_ANY = re.compile(r'\\(?:begin|end)\{[^}]+\}')
+CELL_SEPARATOR = _linear_re(r'\s*&\s*')
+TRAILING_SPACES = _linear_re(r'[ \t]+\n')
+BLANK_LINE_RUNS = _linear_re(r'\n{3,}')
+SPACE_RUNS = _linear_re(r'[ \t]{2,}')
 
-# Column-spec leftovers (after begin-line removal) — nuke them:
-#  - {@...@}, >{...}, <{...}, p{...}, m{...}, b{...}, and stray single " X "
-COLSPEC_GARBAGE_1 = re.compile(r'\{@[^{}]*@\}')
-COLSPEC_GARBAGE_2 = re.compile(r'>\{[^{}]*\}|<\{[^{}]*\}|p\{[^{}]*\}|m\{[^{}]*\}|b\{[^{}]*\}')
-COLSPEC_STANDALONE_LINE = re.compile(r'^\s*\{?@.*@}?\s*$', flags=re.M)   # lines that are just @ ... @
-COLSPEC_ISOLATED_X = re.compile(r'(?<=\s)X(?=\s)')  # rare; only if it’s separated by spaces
+def _fused_repl(m) -> str:
+    kind = m.lastgroup
+    if kind == "spaces":
+        return " "
+    if kind in ("inline_arg", "cmd_arg"):
+        return LATEX_FUSED.sub(_fused_repl, m.group(kind))
+    return ""
 
 def latex_to_plain_text(tex_source: str) -> str:
     # keep only the document body
-    m = re.search(r'\\begin\{document\}(.*)\\end\{document\}', tex_source, re.S)
+    m = DOCUMENT_BODY.search(tex_source)
     body = m.group(1) if m else tex_source
 
     # drop LaTeX comments
-    body = re.sub(r'(?<!\\)%.*', '', body)
+    body = LATEX_COMMENT.sub('', body)
 
     # row breaks first
     body = body.replace('\\\\', '\n')
@@ -249,46 +493,184 @@ def latex_to_plain_text(tex_source: str) -> str:
     # 1) kill entire tabular/tabularx begin/end lines (removes column specs)
     body = TABULAR_LINES.sub('', body)
 
-    # 2) remove ANY remaining \begin{...} / \end{...} (stops "flushright"/"center" leaking)
-    body = BEGIN_END_ANY.sub('', body)
+    # 2) begin/end, spacing, inline formatting, generic commands, column specs
+    if strip_commands is not None:
+        body = strip_commands(body)
+    else:
+        body = LATEX_FUSED.sub(_fused_repl, body)
 
-    # 3) drop spacing/page-style commands entirely (so we don’t keep "0.8em")
-    body = LATEX_DROP_WHOLE.sub('', body)
-
-    # 4) unwrap simple inline formatting
-    body = LATEX_INLINE_KEEPARG_RE.sub(r'\1', body)
-
-    # 5) spacing commands -> single space
-    body = LATEX_INLINE_SPACES.sub(' ', body)
-
-    # 6) misc commands -> drop
-    body = LATEX_MISC_CMDS.sub('', body)
-
-    # 7) generic \cmd{arg} -> arg
-    body = LATEX_CMD_ARG_TO_ARG.sub(r'\1', body)
-
-    # 8) leftover \cmd[...] / \cmd -> drop
-    body = LATEX_CMD_DROP.sub('', body)
-
-    # 9) nuke any column-spec crumbs just in case
-    body = COLSPEC_GARBAGE_1.sub('', body)
-    body = COLSPEC_GARBAGE_2.sub('', body)
+    # 3) column-spec crumbs that need line context
     body = COLSPEC_STANDALONE_LINE.sub('', body)
     body = COLSPEC_ISOLATED_X.sub('', body)
 
-    # 10) braces -> remove
+    # 4) braces -> remove
     body = body.replace('{', '').replace('}', '')
 
-    # 11) table cell separators -> space (or ': ' if you prefer)
-    body = re.sub(r'\s*&\s*', ' ', body)
+    # 5) table cell separators -> space (or ': ' if you prefer)
+    body = CELL_SEPARATOR.sub(' ', body)
 
-    # 12) tidy whitespace
-    body = re.sub(r'[ \t]+\n', '\n', body)
-    body = re.sub(r'\n{3,}', '\n\n', body)
-    body = re.sub(r'[ \t]{2,}', ' ', body)
+    # 6) tidy whitespace
+    body = TRAILING_SPACES.sub('\n', body)
+    body = BLANK_LINE_RUNS.sub('\n\n', body)
+    body = SPACE_RUNS.sub(' ', body)
 
     return body.strip()
 
+# ---------- Row pipeline ----------
+@dataclass
+class CompileJob:
+    ctx: Dict
+    base: str
+    tex_source: str
+    plain: str
+    out_pdf: Path
+    txt_path: Path
+    fmt_path: Path | None
+    cache_key: str
+    job: str   # unique within the shared workdir; file_name alone is not (same base, other template)
+
+async def _compile_worker(queue: asyncio.Queue, engine: str, workdir: Path, plugins,
+                          manifest: Dict[str, str], errors: List[BaseException]):
+    """Consumer: compile queued jobs until the None sentinel arrives."""
+    while True:
+        job = await queue.get()
+        if job is None:
+            return
+        if errors:
+            continue  # a job already failed; just drain
+        try:
+            await compile_pdf(job.tex_source, engine, job.out_pdf, workdir, job.fmt_path, job.job)
+            job.txt_path.write_text(job.plain, encoding="utf-8")
+            manifest[job.cache_key] = str(job.out_pdf.resolve())  # one spelling whatever --out-root was
+
+            # Post-PDF hook
+            call_hook(plugins, "on_pdf", rec=job.ctx, base=job.base, pdf_path=job.out_pdf)
+        except Exception as e:
+            errors.append(e)
+            continue
+
+        print(f"OK: {job.out_pdf}")
+
+async def _put(queue: asyncio.Queue, item, workers: List[asyncio.Task]) -> bool:
+    """
+    queue.put that gives up once no worker is left to make room.
+    Returns False if the item could not be queued.
+    """
+    try:
+        queue.put_nowait(item)
+        return True
+    except asyncio.QueueFull:
+        pass
+    put = asyncio.ensure_future(queue.put(item))
+    while not put.done():
+        alive = [w for w in workers if not w.done()]
+        if not alive:
+            put.cancel()
+            return False
+        await asyncio.wait([put, *alive], return_when=asyncio.FIRST_COMPLETED)
+    return True
+
+async def build_rows(csv_path: Path, env: Environment, plugins, engine: str, pdf_dir: Path, txt_dir: Path,
+                     jobs: int, use_fmt: bool, manifest: Dict[str, str]) -> bool:
+    """
+    Two-stage pipeline: this coroutine renders rows into a bounded queue while
+    `jobs` workers compile from it, so TeX runs while the next rows render and
+    at most 2*jobs rendered documents wait in memory. Rows whose rendered TeX
+    was already built (per `manifest`) are copied instead.
+    Returns False if the CSV had no rows.
+    """
+    tpl_cache: Dict[str, Template] = {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=jobs * 2)
+    errors: List[BaseException] = []
+
+    seen = set()
+    saw_rows = False
+    formats: Dict[str, Path | None] = {}
+    with tempfile.TemporaryDirectory(dir=SCRATCH_ROOT) as scratch:
+        workdir = Path(scratch)
+        workers = [asyncio.create_task(_compile_worker(queue, engine, workdir, plugins, manifest, errors))
+                   for _ in range(jobs)]
+        rows = (
+            row
+            for cols in iter_csv_columns(csv_path)
+            for row in zip(cols["template_id"], cols["file_name"], row_contexts(cols))
+        )
+        render_error: Exception | None = None
+        try:
+            for idx, (template_raw, file_name, ctx) in enumerate(rows, start=2):
+                saw_rows = True
+                if errors or any(w.done() for w in workers):
+                    break
+                line_hint = f"{csv_path.name}:line{idx}"
+                template_id = resolve_template_id(template_raw)
+                base = sanitize_base(file_name)
+
+                key = (template_id, base)
+                if key in seen:
+                    print(f"[SKIP DUP] {line_hint}: duplicate output for template={template_id}, file_name={base}", file=sys.stderr)
+                    continue
+                seen.add(key)
+
+                # Pre-render hook
+                call_hook(plugins, "on_record", rec=ctx, base=base)
+
+                # Render LaTeX to string
+                tpl = tpl_cache.get(template_id)
+                if tpl is None:
+                    tpl = tpl_cache[template_id] = load_template(env, template_id)
+                tex_source = render_tex_to_string(tpl, ctx)
+
+                # Render hook (be liberal with args so older hooks don't break)
+                call_hook(plugins, "on_render", rec=ctx, base=base, tex_source=tex_source, tex_path=None)
+
+                out_pdf = pdf_dir / f"{base}.pdf"
+                plain = latex_to_plain_text(tex_source)
+
+                # Identical TeX built before: reuse that PDF
+                cache_key = content_key(engine, tex_source)
+                cached = manifest.get(cache_key)
+                if cached and Path(cached).exists():
+                    if not (out_pdf.exists() and os.path.samefile(cached, out_pdf)):
+                        copy_pdf(Path(cached), out_pdf)
+                    (txt_dir / f"{base}.txt").write_text(plain, encoding="utf-8")
+                    call_hook(plugins, "on_pdf", rec=ctx, base=base, pdf_path=out_pdf)
+                    print(f"OK (cached): {out_pdf}")
+                    continue
+
+                # One precompiled format per distinct preamble, shared by all compiles
+                fmt_path = None
+                if engine == "pdflatex" and use_fmt and "\\begin{document}" in tex_source:
+                    preamble = tex_source.split("\\begin{document}", 1)[0]
+                    if preamble not in formats:
+                        formats[preamble] = await build_preamble_format(preamble, workdir)
+                    fmt_path = formats[preamble]
+
+                # Compile to run/pdf/<base>.pdf and write run/text/<base>.txt in a worker;
+                # blocks while the queue is full
+                job = CompileJob(ctx, base, tex_source, plain, out_pdf, txt_dir / f"{base}.txt", fmt_path, cache_key,
+                                 job=f"row{idx}")
+                if not await _put(queue, job, workers):
+                    break
+                await asyncio.sleep(0)  # let an idle worker pick it up before rendering on
+        except Exception as e:
+            # Stop producing, but let the compiles already queued finish inside
+            # the scratch dir (as the sequential build did) before re-raising.
+            render_error = e
+        finally:
+            for _ in workers:
+                if not await _put(queue, None, workers):
+                    break
+            for result in await asyncio.gather(*workers, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    errors.append(result)
+
+    # Queued compiles come from earlier rows than the one that failed to render
+    if errors:
+        raise errors[0]
+    if render_error is not None:
+        raise render_error
+    return saw_rows
+
 # ---------- Main ----------
 def main():
     ap = argparse.ArgumentParser()
@@ -298,6 +680,10 @@ def main():
     ap.add_argument("--open", action="store_true", help="Open run folder (Windows)")
     ap.add_argument("--engine", choices=["pdflatex","xelatex","lualatex"], default=None,
                     help="TeX engine (default: xelatex on Windows, pdflatex elsewhere)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                    help="Parallel TeX compiles (default: number of CPUs)")
+    ap.add_argument("--no-fmt", action="store_true",
+                    help="Do not precompile the shared preamble into a format (pdflatex only)")
     args = ap.parse_args()
 
     engine = args.engine or ("xelatex" if os.name == "nt" else "pdflatex")
@@ -311,46 +697,15 @@ def main():
     csv_path = Path(args.csv)
     if not csv_path.exists():
         print(f"CSV not found: {csv_path}", file=sys.stderr); sys.exit(2)
-    rows = read_csv_rows(csv_path)
-    if not rows:
-        print("No rows in CSV.", file=sys.stderr); sys.exit(2)
-
-    seen = set()
-    for idx, row in enumerate(rows, start=2):
-        line_hint = f"{csv_path.name}:line{idx}"
-        validate_row(row, line_hint)
-        template_id = resolve_template_id(row["template_id"])
-        base = sanitize_base(row["file_name"])
-
-        key = (template_id, base)
-        if key in seen:
-            print(f"[SKIP DUP] {line_hint}: duplicate output for template={template_id}, file_name={base}", file=sys.stderr)
-            continue
-        seen.add(key)
-
-        ctx = {k: row[k] for k in PLACEHOLDER_KEYS}
-
-        # Pre-render hook
-        call_hook(plugins, "on_record", rec=ctx, base=base)
-
-        # Render LaTeX to string
-        tex_source = render_tex_to_string(env, template_id, ctx)
-
-        # Render hook (be liberal with args so older hooks don't break)
-        call_hook(plugins, "on_render", rec=ctx, base=base, tex_source=tex_source, tex_path=None)
-
-        # Compile to PDF in tmp and copy to run/pdf/<base>.pdf
-        out_pdf = pdf_dir / f"{base}.pdf"
-        compile_pdf(tex_source, engine, out_pdf)
-
-        # Plain text to run/text/<base>.txt
-        plain = latex_to_plain_text(tex_source)
-        (txt_dir / f"{base}.txt").write_text(plain, encoding="utf-8")
-
-        # Post-PDF hook
-        call_hook(plugins, "on_pdf", rec=ctx, base=base, pdf_path=out_pdf)
+    manifest = load_manifest(out_root)
+    try:
+        saw_rows = asyncio.run(build_rows(csv_path, env, plugins, engine, pdf_dir, txt_dir,
+                                          jobs=max(1, args.jobs), use_fmt=not args.no_fmt, manifest=manifest))
+    finally:
+        save_manifest(out_root, manifest)
 
-        print(f"OK: {out_pdf}")
+    if not saw_rows:
+        print("No rows in CSV.", file=sys.stderr); sys.exit(2)
 
     print(f"\nRun folder: {run_dir}")
     print(f"PDFs:  {pdf_dir}")
@@ -4,16 +4,27 @@ FastAPI service representing the quarantined "judge" LLM layer.
 
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-from typing import Dict, List, Tuple
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, MutableMapping, Set, Tuple
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+
+try:  # optional: one-scan suspicious-pattern matching in vet_prompt
+    import ahocorasick
+except ImportError:  # pragma: no cover
+    ahocorasick = None
 
 try:  # pragma: no cover
     from .liquidai_pii import ExtractionResult, LiquidAIPIIExtractor
+    from .pii_utils import build_placeholder_automaton, session_cache, substitute_placeholders
 except ImportError:  # pragma: no cover
     from liquidai_pii import ExtractionResult, LiquidAIPIIExtractor  # type: ignore
+    from pii_utils import build_placeholder_automaton, session_cache, substitute_placeholders  # type: ignore
 
 
 # Simple heuristic patterns to simulate threat detection.
@@ -26,11 +37,30 @@ SUSPICIOUS_PATTERNS = (
 )
 
 
+def _build_vet_automaton():
+    automaton = ahocorasick.Automaton()
+    for index, pattern in enumerate(SUSPICIOUS_PATTERNS):
+        automaton.add_word(pattern, index)
+    automaton.make_automaton()
+    return automaton
+
+
+# All suspicious patterns matched in one scan of the prompt.
+_VET_AC = _build_vet_automaton() if ahocorasick is not None else None
+
+
 def vet_prompt(prompt: str) -> Tuple[bool, str]:
     lowered = prompt.lower()
-    for pattern in SUSPICIOUS_PATTERNS:
-        if pattern in lowered:
-            return False, f"Prompt rejected: matched '{pattern}'."
+    if _VET_AC is None:
+        for pattern in SUSPICIOUS_PATTERNS:
+            if pattern in lowered:
+                return False, f"Prompt rejected: matched '{pattern}'."
+        return True, "Allowed"
+
+    # Report the earliest-listed pattern, as the sequential check did.
+    hit = min((index for _, index in _VET_AC.iter(lowered)), default=None)
+    if hit is not None:
+        return False, f"Prompt rejected: matched '{SUSPICIOUS_PATTERNS[hit]}'."
     return True, "Allowed"
 
 
@@ -59,22 +89,49 @@ class RehydrateResponse(BaseModel):
     rehydrated_text: str
 
 
-app = FastAPI(title="Judge LLM Service", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the remote endpoint at server start, not at import (no-op offline).
+    await asyncio.to_thread(state.extractor.warm_up)
+    yield
+    # aextract's pooled client lives on this loop; close it before the loop goes.
+    await state.extractor.aclose()
+
+
+app = FastAPI(title="Judge LLM Service", version="0.1.0", lifespan=lifespan)
 
 
 class JudgeState:
     def __init__(self) -> None:
         backend = os.getenv("PII_BACKEND", "offline")
         self.extractor = LiquidAIPIIExtractor(backend=backend)
-        self.sessions: Dict[str, ExtractionResult] = {}
+        # /rehydrate runs on the threadpool while /ingest runs on the loop.
+        self.sessions: MutableMapping[str, ExtractionResult] = session_cache()
+        self.sessions_lock = threading.Lock()
 
     def evaluate(self, session_id: str, prompt: str, hint: str | None = None) -> IngestResponse:
         allowed, reason = vet_prompt(prompt)
+        result = self.extractor.extract(prompt) if allowed else None
+        return self._respond(session_id, prompt, allowed, reason, result)
+
+    async def aevaluate(self, session_id: str, prompt: str, hint: str | None = None) -> IngestResponse:
+        allowed, reason = vet_prompt(prompt)
+        result = await self.extractor.aextract(prompt) if allowed else None
+        return self._respond(session_id, prompt, allowed, reason, result)
+
+    def _respond(
+        self,
+        session_id: str,
+        prompt: str,
+        allowed: bool,
+        reason: str,
+        result: ExtractionResult | None,
+    ) -> IngestResponse:
         sanitized_command = prompt.strip() if allowed else ""
 
-        if allowed:
-            result = self.extractor.extract(prompt)
-            self.sessions[session_id] = result
+        if result is not None:
+            with self.sessions_lock:
+                self.sessions[session_id] = result
             masked_text = result.masked_text
             replacements = result.replacements
         else:
@@ -91,23 +148,22 @@ class JudgeState:
         )
 
     def rehydrate(self, session_id: str, text: str) -> str:
-        result = self.sessions.get(session_id)
+        with self.sessions_lock:
+            result = self.sessions.get(session_id)
         if not result:
             raise KeyError("Unknown session")
-        rehydrated = text
-        for record in result.replacements:
-            placeholder = record["placeholder"]
-            value = record["value"]
-            rehydrated = rehydrated.replace(placeholder, value)
-        return rehydrated
+        mapping = {record["placeholder"]: record["value"] for record in result.replacements}
+        if result.automaton is None and len(mapping) > 1:
+            result.automaton = build_placeholder_automaton(mapping)
+        return substitute_placeholders(mapping, text, result.automaton)
 
 
 state = JudgeState()
 
 
 @app.post("/ingest", response_model=IngestResponse)
-def ingest(payload: IngestRequest) -> IngestResponse:
-    return state.evaluate(payload.session_id, payload.user_prompt, payload.task_hint)
+async def ingest(payload: IngestRequest) -> IngestResponse:
+    return await state.aevaluate(payload.session_id, payload.user_prompt, payload.task_hint)
 
 
 @app.post("/rehydrate", response_model=RehydrateResponse)
@@ -117,3 +173,50 @@ def rehydrate(payload: RehydrateRequest) -> RehydrateResponse:
         return RehydrateResponse(session_id=payload.session_id, rehydrated_text=text)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@app.websocket("/ingest_stream")
+async def ingest_stream(websocket: WebSocket) -> None:
+    """
+    Pipelined /ingest: each frame is an IngestRequest plus a client-chosen "id",
+    answered with the IngestResponse fields under the same "id". Frames are
+    evaluated concurrently, so replies may come back in any order.
+    """
+    send_lock = asyncio.Lock()
+    inflight: Set[asyncio.Task] = set()
+
+    async def reply(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def handle(req_id, payload: IngestRequest) -> None:
+        try:
+            response = await state.aevaluate(payload.session_id, payload.user_prompt, payload.task_hint)
+        except Exception as exc:  # report it on this id; the connection stays up
+            await reply({"id": req_id, "error": str(exc)})
+            return
+        await reply({"id": req_id, **response.model_dump()})
+
+    await websocket.accept()
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except ValueError as exc:  # not JSON: no id to answer on
+                await reply({"id": None, "error": f"Invalid JSON frame: {exc}"})
+                continue
+            req_id = message.pop("id", None) if isinstance(message, dict) else None
+            try:
+                payload = IngestRequest.model_validate(message)
+            except ValidationError as exc:
+                await reply({"id": req_id, "error": str(exc)})
+                continue
+            task = asyncio.create_task(handle(req_id, payload))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+    except WebSocketDisconnect:
+        return
+    finally:
+        for task in inflight:
+            task.cancel()
@@ -2,9 +2,43 @@ import pandas as pd
 from datasets import Dataset, DatasetDict
 from pathlib import Path
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 import json
 
 
+# BOM -> codec; files without one are tried as utf-8, then latin-1
+_BOMS = (
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+)
+
+
+def _read_label_file(label_file_path: Path) -> str:
+    """Read a label file once as bytes and decode it (BOM sniffed, single fallback)."""
+    try:
+        raw = label_file_path.read_bytes()
+    except Exception as e:
+        print(f"Warning: Could not read {label_file_path}: {e}")
+        return ""
+    text = None
+    for bom, codec in _BOMS:
+        if raw.startswith(bom):
+            try:
+                text = raw.decode(codec)
+            except UnicodeDecodeError:
+                pass
+            break
+    if text is None:
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            # Try with different encodings if utf-8 fails
+            text = raw.decode("latin-1")
+    # Universal newlines, as open(..., 'r') gave: \r\n and \r -> \n
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
 #############################################
 ####      Our (=manually crafted) dataset
 #############################################
@@ -35,27 +69,11 @@ def load_our_dataset(
 
     labels_path = Path(labels_dir)
 
-    # Add label content column
-    label_contents = []
-    for file_name in df['file_name']:
-        prefix = "paddle_"
-        label_file_path = labels_path / f"{prefix}{file_name}.txt"
-        try:
-            with open(label_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            # Try with different encodings if utf-8 fails
-            try:
-                with open(label_file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-            except Exception as e:
-                print(f"Warning: Could not read {label_file_path}: {e}")
-                content = ""
-        except Exception as e:
-            print(f"Warning: Could not read {label_file_path}: {e}")
-            content = ""
-
-        label_contents.append(content)
+    # Add label content column (reads overlap on a thread pool; order follows df)
+    prefix = "paddle_"
+    label_paths = [labels_path / f"{prefix}{file_name}.txt" for file_name in df['file_name']]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        label_contents = list(pool.map(_read_label_file, label_paths))
 
     df['text'] = label_contents
 
@@ -0,0 +1,77 @@
+"""
+Helpers shared by the judge service and the PII vault: the detector regex
+engine, bounded session storage and placeholder substitution.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, List, Mapping, MutableMapping
+
+from cachetools import LRUCache
+
+try:  # optional: single-pass placeholder substitution
+    import ahocorasick
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+try:  # optional: linear-time RE2 engine for the PII detectors
+    import re2
+except ImportError:  # pragma: no cover
+    re2 = None
+
+# Engine for the PII detectors: RE2 with PII_USE_RE2=1 (no backtracking blow-ups;
+# note RE2's \d is ASCII-only), the stdlib otherwise.
+pii_regex = re2 if (re2 is not None and os.getenv("PII_USE_RE2") == "1") else re
+
+
+def session_cache() -> MutableMapping[str, Any]:
+    """
+    Bounded session store: least recently used sessions are evicted past
+    SESSION_CACHE_SIZE. LRUCache reorders itself even on get(), so callers
+    that serve threadpool endpoints must guard every access with a lock.
+    """
+    return LRUCache(maxsize=int(os.getenv("SESSION_CACHE_SIZE", "10000")))
+
+
+def build_placeholder_automaton(mapping: Mapping[str, str]):
+    """Aho-Corasick matcher over the placeholders of `mapping`, or None without pyahocorasick."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for placeholder, value in list(mapping.items()):
+        automaton.add_word(placeholder, (len(placeholder), value))
+    automaton.make_automaton()
+    return automaton
+
+
+def substitute_placeholders(mapping: Mapping[str, str], text: str, automaton=None) -> str:
+    """
+    Replace every placeholder (key of `mapping`) in `text` with its value in one
+    pass. `automaton` comes from build_placeholder_automaton over the same
+    mapping; without one, re.sub over an alternation of the (unique)
+    placeholders still builds the output in a single buffer.
+    """
+    if not mapping:
+        return text
+    if len(mapping) == 1:
+        ((placeholder, value),) = mapping.items()
+        return text.replace(placeholder, value) if placeholder in text else text
+    if automaton is None:
+        pattern = "|".join(re.escape(placeholder) for placeholder in mapping)
+        return re.sub(pattern, lambda m: mapping[m.group(0)], text)
+
+    # Placeholders are bracketed and unique, so matches never overlap:
+    # one scan, one join.
+    parts: List[str] = []
+    last = 0
+    for end, (length, value) in automaton.iter(text):
+        start = end - length + 1
+        parts.append(text[last:start])
+        parts.append(value)
+        last = end + 1
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
@@ -6,8 +6,13 @@ from __future__ import annotations
 
 import argparse
 import json
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+
+try:  # optional: faster JSONL encoding
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 try:  # pragma: no cover - convenience for direct execution
     from .liquidai_pii import LiquidAIPIIExtractor, iter_text_files
@@ -47,21 +52,36 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional Hugging Face access token if you have one.",
     )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=16,
+        help="How many files may be read/extracted ahead of the output writer.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="How many files to send to the endpoint concurrently.",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    extractor = LiquidAIPIIExtractor(model_name=args.model, hf_token=args.hf_token)
+    extractor = LiquidAIPIIExtractor(
+        model_name=args.model, hf_token=args.hf_token, max_connections=args.concurrency
+    )
     args.output.parent.mkdir(parents=True, exist_ok=True)
 
+    files = list(islice(iter_text_files(args.input), args.limit))
+    texts = (file_path.read_text(encoding="utf-8") for file_path in files)
+    results = extractor.extract_batch(texts, max_concurrency=args.concurrency, prefetch=args.prefetch)
+
     files_processed = 0
     with args.output.open("w", encoding="utf-8") as writer:
-        for file_path in iter_text_files(args.input):
-            if args.limit is not None and files_processed >= args.limit:
-                break
-            text = file_path.read_text(encoding="utf-8")
-            result = extractor.extract(text)
+        # Extractions overlap on the pool; lines are still written in file order.
+        for file_path, result in zip(files, results):
             payload = {
                 "file": str(file_path),
                 "model": args.model,
@@ -69,7 +89,10 @@ def main() -> None:
                 "masked_text": result.masked_text,
                 "replacements": result.replacements,
             }
-            writer.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            if orjson is not None:
+                writer.write(orjson.dumps(payload).decode("utf-8") + "\n")
+            else:
+                writer.write(json.dumps(payload, ensure_ascii=False) + "\n")
             print(f"Processed {file_path} -> {result.raw_json}")
             files_processed += 1
 
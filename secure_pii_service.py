@@ -5,14 +5,26 @@ Secure, stateful FastAPI service that masks PII and stores mappings per session.
 from __future__ import annotations
 
 import re
-from typing import Dict, Tuple
+import threading
+from typing import Dict, MutableMapping, Tuple
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import uvicorn
 
-# In-memory session storage: {session_id: {placeholder: real_value}}
-pii_maps: Dict[str, Dict[str, str]] = {}
+from redact.pii_utils import build_placeholder_automaton, pii_regex, session_cache, substitute_placeholders
+
+# In-memory session storage:
+#   {session_id: {"fwd": {placeholder: real_value}, "rev": {real_value: placeholder},
+#                 "n": placeholders issued, "automaton": (n at build time, matcher) or None,
+#                 "lock": guards this session's maps and automaton}}
+# The automaton is built on /rehydrate and rebuilt once "n" has moved past the one it was built for.
+# The sync endpoints run on a threadpool, so every access goes through _pii_maps_lock.
+pii_maps: MutableMapping[str, Dict[str, object]] = session_cache()
+_pii_maps_lock = threading.Lock()
+
+# "Firstname Lastname" detector, compiled once at import.
+_PERSON_RE = pii_regex.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
 
 
 class SanitizeRequest(BaseModel):
@@ -43,34 +55,32 @@ def find_and_mask_pii(session_id: str, text: str) -> Tuple[str, Dict[str, str]]:
     Detects simple Firstname Lastname strings, swaps them with placeholders,
     and updates the per-session mapping.
     """
-    session_map = pii_maps.get(session_id, {})
-    reverse_map = {real: placeholder for placeholder, real in session_map.items()}
-
-    person_pattern = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
-    matches = person_pattern.findall(text)
-
+    with _pii_maps_lock:
+        session = pii_maps.get(session_id)
+        if session is None:
+            session = pii_maps[session_id] = {
+                "fwd": {}, "rev": {}, "n": 0, "automaton": None, "lock": threading.Lock()
+            }
+    forward: Dict[str, str] = session["fwd"]
+    reverse: Dict[str, str] = session["rev"]
     replacements: Dict[str, str] = {}
-    person_to_placeholder: Dict[str, str] = {}
-    next_index = len(session_map) + 1
-
-    for match in matches:
-        if match in person_to_placeholder:
-            continue
-        if match in reverse_map:
-            placeholder = reverse_map[match]
-        else:
-            placeholder = f"[PERSON_{next_index}]"
-            next_index += 1
-            session_map[placeholder] = match
-            replacements[placeholder] = match
-        person_to_placeholder[match] = placeholder
 
+    # Placeholders are numbered in order of first appearance, assigned during the
+    # substitution pass itself; both maps are kept current so nothing is rebuilt.
     def _replace(match_obj: re.Match[str]) -> str:
         full = match_obj.group(0)
-        return person_to_placeholder.get(full, full)
-
-    masked_text = person_pattern.sub(_replace, text)
-    pii_maps[session_id] = session_map
+        placeholder = reverse.get(full)
+        if placeholder is None:
+            issued = session["n"] + 1
+            placeholder = f"[PERSON_{issued}]"
+            forward[placeholder] = full
+            reverse[full] = placeholder
+            replacements[placeholder] = full
+            session["n"] = issued  # only after the maps hold it (see _session_automaton)
+        return placeholder
+
+    with session["lock"]:
+        masked_text = _PERSON_RE.sub(_replace, text)
     return masked_text, replacements
 
 
@@ -89,16 +99,28 @@ def sanitize(payload: SanitizeRequest) -> SanitizeResponse:
 
 @app.post("/rehydrate", response_model=RehydrateResponse)
 def rehydrate(payload: RehydrateRequest) -> RehydrateResponse:
-    mapping = pii_maps.get(payload.session_id)
-    if mapping is None:
+    with _pii_maps_lock:
+        session = pii_maps.get(payload.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Unknown session_id")
 
-    rehydrated = payload.text
-    for placeholder, real_value in mapping.items():
-        rehydrated = rehydrated.replace(placeholder, real_value)
+    with session["lock"]:
+        rehydrated = substitute_placeholders(session["fwd"], payload.text, _session_automaton(session))
 
     return RehydrateResponse(session_id=payload.session_id, rehydrated_text=rehydrated)
 
 
+def _session_automaton(session: Dict[str, object]):
+    # Tagged with the placeholder count it covers: an automaton built from an
+    # older map (e.g. racing a /sanitize) is never reused once "n" has moved on.
+    issued = session["n"]
+    cached = session["automaton"]
+    if cached is not None and cached[0] == issued:
+        return cached[1]
+    automaton = build_placeholder_automaton(session["fwd"])
+    session["automaton"] = (issued, automaton)
+    return automaton
+
+
 if __name__ == "__main__":
     uvicorn.run("secure_pii_service:app", host="127.0.0.1", port=8000, reload=False)
@@ -0,0 +1,34 @@
+import importlib.util
+import shutil
+from pathlib import Path
+
+import pytest
+
+GENERATE_PY = Path(__file__).resolve().parents[1] / "redact/data/data_generation/scripts/generate.py"
+_spec = importlib.util.spec_from_file_location("generate", GENERATE_PY)
+generate = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(generate)
+
+HEADER = "file_name,full_name,company_name,company_address,phone_number,template_id\n"
+
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_iter_csv_columns_skips_whitespace_only_lines(tmp_path, monkeypatch, use_pyarrow):
+    if not use_pyarrow:
+        monkeypatch.setattr(generate, "pa", None)
+    csv_path = tmp_path / "master.csv"
+    csv_path.write_text(HEADER + "a,Al,Co,Addr,03-1,1\n   \n\t\nb,Bo,Co,Addr,03-2,2\n", encoding="utf-8")
+
+    batches = list(generate.iter_csv_columns(csv_path))
+
+    assert [name for cols in batches for name in cols["file_name"]] == ["a", "b"]
+
+
+def test_copy_pdf_refuses_to_copy_a_file_onto_itself(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.5 data")
+
+    with pytest.raises(shutil.SameFileError):
+        generate.copy_pdf(pdf, tmp_path / "." / "doc.pdf")
+
+    assert pdf.read_bytes() == b"%PDF-1.5 data"
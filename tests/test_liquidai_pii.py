@@ -1,4 +1,10 @@
-from redact.liquidai_pii import LiquidAIPIIExtractor, _alphabetical_entities
+import asyncio
+import time
+
+import pytest
+
+from redact import liquidai_pii
+from redact.liquidai_pii import ExtractionResult, LiquidAIPIIExtractor, _alphabetical_entities
 
 
 def test_alphabetical_entities_deduplicates():
@@ -21,3 +27,80 @@ def test_mask_text_replaces_longer_values_first():
     human_entries = [item for item in replacements if item["category"] == "human_name"]
     assert human_entries[0]["value"] == "Taro Yamada"
     assert human_entries[1]["value"] == "Taro"
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@pytest.mark.parametrize(
+    "generation",
+    [
+        '{"email_address": ["a@b.co"]} trailing {..}',
+        'Sure: {"email_address": ["a@b.co"]}\n{"email_address": ["x@y.co"]}<|im_end|>',
+    ],
+)
+def test_parse_json_reads_first_object_and_ignores_trailing_text(monkeypatch, use_orjson, generation):
+    if not use_orjson:
+        monkeypatch.setattr(liquidai_pii, "orjson", None)
+    extractor = LiquidAIPIIExtractor(backend="offline", hf_token="dummy")
+    parsed = extractor._parse_json(generation)
+    assert parsed["email_address"] == ["a@b.co"]
+    assert parsed["human_name"] == []
+
+
+def test_offline_extract_does_not_report_email_digits_as_phone():
+    extractor = LiquidAIPIIExtractor(backend="offline", hf_token="dummy")
+    result = extractor.extract("Mail user12345678@x.com today.")
+    assert result.raw_json["email_address"] == ["user12345678@x.com"]
+    assert result.raw_json["phone_number"] == []
+    assert result.masked_text == "Mail [EMAIL_ADDRESS_1] today."
+
+
+def test_extract_batch_yields_results_in_input_order(monkeypatch):
+    extractor = LiquidAIPIIExtractor(backend="offline", hf_token="dummy")
+    texts = [f"Mail user{i}@example.com" for i in range(5)]
+    offline = [extractor.extract(text).masked_text for text in texts]
+    assert [r.masked_text for r in extractor.extract_batch(iter(texts))] == offline
+
+    # Remote path: calls overlap on the pool, results still come back in input order
+    # even though earlier texts take longer.
+    monkeypatch.setattr(extractor, "backend", "remote")
+    delays = {text: 0.05 * (len(texts) - i) for i, text in enumerate(texts)}
+
+    def slow_extract(text):
+        time.sleep(delays[text])
+        return ExtractionResult(raw_json={}, masked_text=text, replacements=[])
+
+    monkeypatch.setattr(extractor, "extract", slow_extract)
+    results = list(extractor.extract_batch(iter(texts), max_concurrency=5))
+    assert [r.masked_text for r in results] == texts
+
+
+def test_aextract_sends_only_auth_and_content_type_headers(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    monkeypatch.setenv("HF_ENDPOINT", "https://endpoint.example/")
+    extractor = LiquidAIPIIExtractor(hf_token="secret")
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers)
+        return httpx.Response(200, json=[{"generated_text": '{"email_address": ["a@b.co"]}'}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        liquidai_pii.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+
+    async def run():
+        try:
+            return await extractor.aextract("Mail a@b.co")
+        finally:
+            await extractor.aclose()
+
+    result = asyncio.run(run())
+
+    assert result.masked_text == "Mail [EMAIL_ADDRESS_1]"
+    headers = sent[0]
+    assert headers["authorization"] == "Bearer secret"
+    assert headers["content-type"] == "application/json"
+    assert "python-requests" not in headers.get("user-agent", "")
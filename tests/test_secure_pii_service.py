@@ -2,8 +2,10 @@
 Unit tests for the secure PII FastAPI service.
 """
 
+from cachetools import LRUCache
 from fastapi.testclient import TestClient
 
+import secure_pii_service
 from secure_pii_service import app, pii_maps
 
 
@@ -102,3 +104,49 @@ def test_session_isolation_between_clients() -> None:
 
     assert rehydrated_a == "John Doe works here."
     assert rehydrated_b == "John Doe works here."
+
+
+def test_placeholder_numbering_continues_across_sanitize_calls() -> None:
+    pii_maps.clear()
+    session_id = "session-multi"
+    first_text = "John Doe met Alice Smith."
+    second_text = "Bob Jones emailed John Doe."
+
+    first = client.post(
+        "/sanitize", json={"session_id": session_id, "text": first_text}, timeout=5
+    ).json()
+    second = client.post(
+        "/sanitize", json={"session_id": session_id, "text": second_text}, timeout=5
+    ).json()
+
+    assert first["masked_text"] == "[PERSON_1] met [PERSON_2]."
+    assert second["masked_text"] == "[PERSON_3] emailed [PERSON_1]."
+    assert second["replacements"] == {"[PERSON_3]": "Bob Jones"}
+
+    rehydrated = client.post(
+        "/rehydrate",
+        json={"session_id": session_id, "text": first["masked_text"] + " " + second["masked_text"]},
+        timeout=5,
+    ).json()["rehydrated_text"]
+    assert rehydrated == first_text + " " + second_text
+
+
+def test_least_recently_used_session_is_evicted(monkeypatch) -> None:
+    monkeypatch.setattr(secure_pii_service, "pii_maps", LRUCache(maxsize=2))
+    for session_id in ("session-a", "session-b"):
+        client.post("/sanitize", json={"session_id": session_id, "text": "John Doe"}, timeout=5)
+
+    # Touch session-a so session-b becomes the least recently used one.
+    assert client.post(
+        "/rehydrate", json={"session_id": "session-a", "text": "[PERSON_1]"}, timeout=5
+    ).status_code == 200
+    client.post("/sanitize", json={"session_id": "session-c", "text": "Alice Smith"}, timeout=5)
+
+    evicted = client.post(
+        "/rehydrate", json={"session_id": "session-b", "text": "[PERSON_1]"}, timeout=5
+    )
+    assert evicted.status_code == 404
+    kept = client.post(
+        "/rehydrate", json={"session_id": "session-a", "text": "[PERSON_1]"}, timeout=5
+    )
+    assert kept.json()["rehydrated_text"] == "John Doe"